@@ -0,0 +1,350 @@
+import gzip
+import importlib.util
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).resolve().parents[4] / "scripts" / "import_chatgpt_gdpr_sample.py"
+
+spec = importlib.util.spec_from_file_location("import_chatgpt_gdpr_sample", SCRIPT_PATH)
+importer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(importer)
+
+requires_ijson = pytest.mark.skipif(importer.ijson is None, reason="ijson is not installed")
+
+
+def split_every(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonHelpers:
+    """Test the orjson/stdlib JSON helpers"""
+
+    def test_loads_lone_surrogate(self):
+        """Test that a truncated emoji escape is parsed instead of rejected"""
+        assert importer.json_loads(b'{"text": "hi \\ud83d"}') == {"text": "hi \ud83d"}
+
+    @pytest.mark.parametrize("indent", [False, True])
+    def test_dumps_lone_surrogate(self, indent):
+        """Test that a lone surrogate is encoded as an escape that round-trips"""
+        data = importer.json_dumps({"text": "hi \ud83d"}, indent=indent)
+
+        assert b"\\ud83d" in data
+        assert json.loads(data) == {"text": "hi \ud83d"}
+
+    def test_dumps_compact_by_default(self):
+        """Test that the default encoding is compact UTF-8"""
+        assert importer.json_dumps({"a": ["é", 1]}) == '{"a":["é",1]}'.encode()
+
+
+def make_branchy_convo(leaf_times, current_node=None):
+    """One question with an answer leaf per entry of `leaf_times` (None: no timestamp)."""
+    mapping = {
+        "root": {
+            "id": "root",
+            "parent": None,
+            "children": [f"leaf{i}" for i in range(len(leaf_times))],
+            "message": {
+                "id": "root",
+                "author": {"role": "user"},
+                "create_time": 100.0,
+                "content": {"content_type": "text", "parts": ["question"]},
+            },
+        }
+    }
+    for i, create_time in enumerate(leaf_times):
+        message = {
+            "id": f"leaf{i}",
+            "author": {"role": "assistant"},
+            "content": {"content_type": "text", "parts": [f"answer {i}"]},
+        }
+        if create_time is not None:
+            message["create_time"] = create_time
+        mapping[f"leaf{i}"] = {
+            "id": f"leaf{i}",
+            "parent": "root",
+            "children": [],
+            "message": message,
+        }
+
+    convo = {"id": "conv", "title": "Branchy", "create_time": 100.0, "mapping": mapping}
+    if current_node is not None:
+        convo["current_node"] = current_node
+    return convo
+
+
+def converted_texts(convo):
+    chat_obj, _ = importer.build_chat_payload(
+        convo, include_system=False, include_tool=False, keep_empty=False
+    )
+    return [message["content"] for message in chat_obj["messages"]]
+
+
+class TestCurrentNodeFallback:
+    """Test which branch is converted when current_node is missing or dangling"""
+
+    def test_most_recent_leaf_wins(self):
+        """Test that the newest leaf is used, not the first one in the mapping"""
+        convo = make_branchy_convo([200.0, 400.0, 300.0])
+
+        assert converted_texts(convo) == ["question", "answer 1"]
+
+    def test_dangling_current_node_uses_most_recent_leaf(self):
+        """Test that a current_node missing from the mapping is treated as absent"""
+        convo = make_branchy_convo([200.0, 400.0, 300.0], current_node="gone")
+
+        assert converted_texts(convo) == ["question", "answer 1"]
+
+    def test_ties_keep_first_leaf(self):
+        """Test that leaves with equal timestamps resolve to the first one"""
+        convo = make_branchy_convo([300.0, 300.0, 200.0])
+
+        assert converted_texts(convo) == ["question", "answer 0"]
+
+    def test_leaf_without_timestamp_loses_to_timestamped_leaf(self):
+        """Test that a leaf without create_time counts as the oldest"""
+        convo = make_branchy_convo([None, 200.0])
+
+        assert converted_texts(convo) == ["question", "answer 1"]
+
+    def test_leaves_without_timestamps_keep_first_leaf(self):
+        """Test that without any timestamps the first leaf is used"""
+        convo = make_branchy_convo([None, None, None])
+
+        assert converted_texts(convo) == ["question", "answer 0"]
+
+    def test_valid_current_node_is_followed(self):
+        """Test that a valid current_node wins over a newer leaf"""
+        convo = make_branchy_convo([200.0, 400.0, 300.0], current_node="leaf2")
+
+        assert converted_texts(convo) == ["question", "answer 2"]
+
+    def test_valid_current_node_ignores_other_leaves(self):
+        """Test that other leaves' timestamps do not change a valid current_node branch"""
+        convo = make_branchy_convo([200.0, 400.0, 300.0], current_node="leaf0")
+        reordered = make_branchy_convo([500.0, 100.0, None], current_node="leaf0")
+        reordered["mapping"]["leaf0"]["message"]["create_time"] = 200.0
+
+        assert converted_texts(convo) == converted_texts(reordered) == ["question", "answer 0"]
+
+
+@requires_ijson
+class TestCountJsonItems:
+    """Test counting top-level array items from a streamed response"""
+
+    @pytest.mark.parametrize("size", [1, 3, 1024])
+    def test_counts_items_across_chunk_boundaries(self, size):
+        """Test that the count does not depend on where chunks are split"""
+        data = b'[{"id": "a", "chat": {"messages": [{}, {}]}}, [1, [2]], "x", 4, null]'
+
+        assert importer.count_json_items(split_every(data, size)) == 5
+
+    def test_empty_array(self):
+        """Test that an empty array counts as zero items"""
+        assert importer.count_json_items([b"[", b" ]"]) == 0
+
+    def test_empty_chunks_are_skipped(self):
+        """Test that empty chunks do not end the stream early"""
+        assert importer.count_json_items([b"", b"[1,", b"", b"2]", b""]) == 2
+
+    @pytest.mark.parametrize("data", [b'{"chats": []}', b'"ok"', b""])
+    def test_non_array_raises_json_error(self, data):
+        """Test that a body that is not a JSON array is rejected"""
+        with pytest.raises(importer.ijson.JSONError):
+            importer.count_json_items([data])
+
+    def test_truncated_array_raises_json_error(self):
+        """Test that a truncated body is rejected"""
+        with pytest.raises(importer.ijson.JSONError):
+            importer.count_json_items([b"[1, 2"])
+
+
+@requires_ijson
+class TestIterJsonItems:
+    """Test streaming items out of a chunked JSON array"""
+
+    def test_yields_items_with_empty_chunks(self):
+        """Test that empty chunks do not end the stream early"""
+        data = json.dumps([{"meta": {"n": n}} for n in range(5)]).encode()
+        chunks = [b""] + [piece for chunk in split_every(data, 7) for piece in (chunk, b"")]
+
+        assert list(importer.iter_json_items(chunks, "item.meta")) == [
+            {"n": n} for n in range(5)
+        ]
+
+
+class TestReservoirSample:
+    """Test the one-pass random sample used for streamed selection"""
+
+    def test_short_input_is_returned_whole(self):
+        """Test that fewer items than requested are all returned"""
+        rng = random.Random(1)
+
+        assert importer.reservoir_sample(iter(range(3)), 5, rng) == [0, 1, 2]
+
+    def test_zero_size_sample(self):
+        """Test that a sample of size zero is empty"""
+        rng = random.Random(1)
+
+        assert importer.reservoir_sample(iter(range(10)), 0, rng) == []
+
+    def test_sample_is_distinct_items_from_input(self):
+        """Test that the sample has k distinct items taken from the input"""
+        rng = random.Random(7)
+        sample = importer.reservoir_sample(iter(range(10_000)), 50, rng)
+
+        assert len(sample) == 50
+        assert len(set(sample)) == 50
+        assert all(0 <= item < 10_000 for item in sample)
+
+    def test_same_seed_same_sample(self):
+        """Test that a seeded run is reproducible"""
+        first = importer.reservoir_sample(range(1000), 10, random.Random(42))
+        second = importer.reservoir_sample(range(1000), 10, random.Random(42))
+
+        assert first == second
+
+    def test_every_item_is_equally_likely(self):
+        """Test that items early and late in the stream are picked equally often"""
+        n, k, trials = 20, 5, 4000
+        rng = random.Random(3)
+        counts = [0] * n
+        for _ in range(trials):
+            for item in importer.reservoir_sample(range(n), k, rng):
+                counts[item] += 1
+
+        expected = trials * k / n
+        assert all(abs(count - expected) < 0.15 * expected for count in counts)
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request(b"")
+
+    def do_POST(self):
+        self.handle_request(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+    def handle_request(self, body):
+        server = self.server
+        server.requests.append((self.command, self.path, self.client_address[1], body))
+        hits = sum(1 for _, path, _, _ in server.requests if path == self.path)
+
+        if self.path == "/drop":
+            # The request is accepted, but the connection closes before any response.
+            self.close_connection = True
+            return
+
+        status, data, headers = 200, b"[1]", {}
+        if self.path.startswith("/status/") and hits < 3:
+            status, data = int(self.path.rsplit("/", 1)[1]), b'{"detail": "busy"}'
+        elif self.path == "/gzip":
+            data, headers = gzip.compress(b"[1, 2, 3]"), {"Content-Encoding": "gzip"}
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if self.path == "/idle-close":
+            # Drop the keep-alive socket without announcing it.
+            self.close_connection = True
+
+
+class RecordingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RecordingHandler)
+        self.requests = []
+        self.closed = threading.Event()
+
+    def shutdown_request(self, request):
+        super().shutdown_request(request)
+        self.closed.set()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    for name in ("http_proxy", "HTTP_PROXY", "all_proxy", "ALL_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(importer, "httpx", None)
+    monkeypatch.setattr(importer, "RETRY_BACKOFF", 0)
+
+    srv = RecordingServer()
+    thread = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    try:
+        yield srv
+    finally:
+        importer.close_http_client()
+        srv.shutdown()
+        srv.server_close()
+
+
+def url(srv, path):
+    return f"http://127.0.0.1:{srv.server_address[1]}{path}"
+
+
+class TestKeepaliveRequest:
+    """Test the http.client keep-alive transport used without httpx"""
+
+    def request(self, method, target, body=None):
+        return importer.keepalive_request(method, target, headers={}, body=body, timeout=5)
+
+    def test_post_after_idle_close_uses_fresh_socket(self, server):
+        """Test that a POST after the server dropped an idle socket still succeeds"""
+        assert self.request("GET", url(server, "/idle-close")) == b"[1]"
+        assert server.closed.wait(5)
+
+        assert self.request("POST", url(server, "/ok"), b'{"chats":[]}') == b"[1]"
+
+        (_, _, first_port, _), (_, _, second_port, body) = server.requests
+        assert first_port != second_port
+        assert body == b'{"chats":[]}'
+
+    def test_keepalive_socket_is_reused(self, server):
+        """Test that consecutive requests share one connection"""
+        self.request("GET", url(server, "/ok"))
+        self.request("POST", url(server, "/ok"), b"{}")
+
+        assert len({port for _, _, port, _ in server.requests}) == 1
+
+    def test_post_with_lost_response_is_sent_once(self, server):
+        """Test that a POST whose response is lost raises instead of being resent"""
+        self.request("POST", url(server, "/ok"), b"{}")
+
+        with pytest.raises(ConnectionError):
+            self.request("POST", url(server, "/drop"), b'{"chats":[]}')
+
+        drops = [port for _, path, port, _ in server.requests if path == "/drop"]
+        assert len(drops) == 1
+        assert drops[0] == server.requests[0][2]
+
+    @pytest.mark.parametrize("status", [502, 503, 504])
+    def test_get_is_retried_on_gateway_errors(self, server, status):
+        """Test that a GET is retried until the gateway error clears"""
+        assert importer.http_request("GET", url(server, f"/status/{status}"), headers={}) == b"[1]"
+
+        assert len(server.requests) == 3
+
+    def test_post_is_not_retried_on_gateway_errors(self, server):
+        """Test that a POST surfaces a gateway error without being resent"""
+        with pytest.raises(importer.error.HTTPError) as exc_info:
+            importer.http_request("POST", url(server, "/status/503"), headers={}, body=b"{}")
+
+        assert exc_info.value.code == 503
+        assert len(server.requests) == 1
+
+    def test_gzip_response_is_decoded(self, server):
+        """Test that a gzip-encoded response body is decompressed"""
+        assert self.request("GET", url(server, "/gzip")) == b"[1, 2, 3]"
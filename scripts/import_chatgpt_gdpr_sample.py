@@ -14,19 +14,84 @@ Default mode is for a safe pilot:
 
 Use `--count 0` to select all convertible conversations.
 Use `--chunk-size` for safer large imports.
+The source is parsed incrementally when `ijson` is installed, so memory use is
+bounded by the selection rather than the export size. Without it, the whole
+file is loaded at once.
+
+The module type-checks cleanly, so for very large exports it can be compiled
+ahead of time with `mypyc --ignore-missing-imports import_chatgpt_gdpr_sample.py`
+(run from `scripts/`) and invoked as
+`python -c "import import_chatgpt_gdpr_sample as m; m.main()" --source ...`.
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import functools
 import getpass
+import gzip
+import http.client
+import io
+import itertools
 import json
+import math
+import multiprocessing
 import os
+import queue
 import random
+import select
 import sys
+import tempfile
+import threading
 import time
-from typing import Any
-from urllib import error, request
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from email.message import Message
+from typing import Any, BinaryIO, Iterable, Iterator, TextIO
+from urllib import error, parse, request
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used when unavailable.
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import ijson
+except ImportError:  # Optional; the whole source is loaded at once without it.
+    ijson = None  # type: ignore[assignment]
+
+try:
+    import httpx
+except ImportError:  # Optional; falls back to http.client keep-alive connections.
+    httpx = None  # type: ignore[assignment]
+
+_http_client: Any = None
+# Keyed by (scheme, netloc, thread id): an http.client connection must not be
+# shared between concurrent uploads.
+_connections: dict[tuple[str, str, int], http.client.HTTPConnection] = {}
+
+# Idempotent (GET) requests are retried on these gateway errors with backoff.
+RETRY_STATUSES = frozenset({502, 503, 504})
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+
+# Conversations handed to each worker process per task with --workers > 1.
+CONVERT_CHUNKSIZE = 64
+
+# When streaming, the random sample is drawn before conversion, so keep a few
+# spare conversations around in case some of them turn out to be unconvertible.
+# If a sample still falls short, later passes draw twice as many each time.
+STREAM_OVERSAMPLE = 2
+
+# ijson reads the source in chunks of this size; large reads keep the number of
+# read() syscalls on multi-GB exports low.
+STREAM_READ_SIZE = 1 << 20
 
 
 def parse_args() -> argparse.Namespace:
@@ -55,6 +120,11 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Keep source order instead of randomizing selection.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Fail instead of loading the whole source when ijson is not installed.",
+    )
     parser.add_argument(
         "--base-url",
         default=os.environ.get("OPENWEBUI_BASE_URL", "http://127.0.0.1:8080/api/v1"),
@@ -91,6 +161,12 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="When chunk import fails, continue by trying one chat at a time.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Upload up to this many chunks at once (default: 1).",
+    )
     parser.add_argument(
         "--state-file",
         default=None,
@@ -112,6 +188,19 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional path to write the generated import payload JSON.",
     )
+    parser.add_argument(
+        "--spool-path",
+        default=None,
+        help=(
+            "With --count 0, where to spool converted chats as NDJSON while importing "
+            "(default: a temporary file when --output is set, removed afterwards)."
+        ),
+    )
+    parser.add_argument(
+        "--pretty-output",
+        action="store_true",
+        help="Indent the --output JSON for readability (default: compact).",
+    )
     parser.add_argument(
         "--include-system",
         action="store_true",
@@ -127,18 +216,78 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Keep messages even when extracted content is empty.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Convert conversations in this many worker processes (default: 1).",
+    )
     return parser.parse_args()
 
 
+# orjson is stricter than the stdlib: it rejects lone UTF-16 surrogates (e.g. a
+# truncated emoji "\ud83d"), which GDPR exports can contain. Such input falls
+# back to stdlib json instead of failing.
+
+
+def json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except orjson.JSONEncodeError:
+            pass
+
+    separators = None if indent else (",", ":")
+    try:
+        return json.dumps(
+            obj, ensure_ascii=False, indent=2 if indent else None, separators=separators
+        ).encode("utf-8")
+    except UnicodeEncodeError:
+        # Lone surrogates cannot be encoded as UTF-8; escape them instead.
+        return json.dumps(obj, indent=2 if indent else None, separators=separators).encode(
+            "ascii"
+        )
+
+
+def encode_chats(encoded_forms: list[bytes]) -> bytes:
+    """Splice already-encoded forms into a compact {"chats": [...]} body."""
+    return b'{"chats":[' + b",".join(encoded_forms) + b"]}"
+
+
 def as_int_timestamp(value: Any, fallback: int | None = None) -> int:
-    if fallback is None:
-        fallback = int(time.time())
+    # Parsed JSON timestamps are almost always plain floats or ints.
+    value_type = type(value)
+    if value_type is float and math.isfinite(value):
+        return int(value)
+    if value_type is int:
+        return value
+
     try:
-        if value is None:
-            return fallback
-        return int(float(value))
+        if value is not None:
+            return int(float(value))
     except Exception:
-        return fallback
+        pass
+    return fallback if fallback is not None else int(time.time())
+
+
+_PREFERRED_KEYS = (
+    "text",
+    "content",
+    "summary",
+    "title",
+    "name",
+    "user_instructions",
+    "user_profile",
+)
 
 
 def best_effort_text(obj: Any) -> str:
@@ -147,33 +296,46 @@ def best_effort_text(obj: Any) -> str:
     if not isinstance(obj, dict):
         return ""
 
-    preferred_keys = [
-        "text",
-        "content",
-        "summary",
-        "title",
-        "name",
-        "user_instructions",
-        "user_profile",
-    ]
-
+    # Walk nested dicts with an explicit stack of value iterators; a nested
+    # dict's pieces land in place, which matches joining its text recursively.
+    # Most dicts have no nested dict, so the stack is only built on demand.
     pieces: list[str] = []
-    for key in preferred_keys:
-        value = obj.get(key)
-        if isinstance(value, str) and value.strip():
-            pieces.append(value.strip())
-        elif isinstance(value, list):
-            strings = [item.strip() for item in value if isinstance(item, str) and item.strip()]
-            if strings:
-                pieces.append("\n".join(strings))
-        elif isinstance(value, dict):
-            nested = best_effort_text(value)
-            if nested:
-                pieces.append(nested)
-
-    if pieces:
-        return "\n".join(pieces)
-    return ""
+    stack: list[Iterator[Any]] | None = None
+    values: Iterator[Any] = map(obj.get, _PREFERRED_KEYS)
+    while True:
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+                if value:
+                    pieces.append(value)
+            elif isinstance(value, list):
+                strings = [item.strip() for item in value if isinstance(item, str) and item.strip()]
+                if strings:
+                    pieces.append("\n".join(strings))
+            elif isinstance(value, dict):
+                if stack is None:
+                    stack = []
+                stack.append(values)
+                values = map(value.get, _PREFERRED_KEYS)
+                break
+        else:
+            if not stack:
+                break
+            values = stack.pop()
+
+    return "\n".join(pieces)
+
+
+_ASSET_POINTER_TYPES = frozenset(
+    {
+        "image_asset_pointer",
+        "audio_asset_pointer",
+        "real_time_user_audio_video_asset_pointer",
+        "video_container_asset_pointer",
+    }
+)
 
 
 def multimodal_parts_to_text(parts: Any) -> str:
@@ -181,95 +343,88 @@ def multimodal_parts_to_text(parts: Any) -> str:
         return "[multimodal_text]"
 
     out: list[str] = []
+    out_append = out.append
     for part in parts:
         if isinstance(part, str):
             text = part.strip()
             if text:
-                out.append(text)
+                out_append(text)
             continue
 
         if not isinstance(part, dict):
             continue
 
-        content_type = part.get("content_type", "unknown")
+        get = part.get
+        content_type = get("content_type", "unknown")
 
         if content_type == "audio_transcription":
-            text = part.get("text") or part.get("transcript")
-            if isinstance(text, str) and text.strip():
-                out.append(text.strip())
+            transcript = get("text") or get("transcript")
+            if isinstance(transcript, str):
+                transcript = transcript.strip()
+                if transcript:
+                    out_append(transcript)
             continue
 
-        if content_type in {
-            "image_asset_pointer",
-            "audio_asset_pointer",
-            "real_time_user_audio_video_asset_pointer",
-            "video_container_asset_pointer",
-        }:
-            pointer = part.get("asset_pointer")
-            if isinstance(pointer, str) and pointer.strip():
-                out.append(f"[{content_type}: {pointer.strip()}]")
-            else:
-                out.append(f"[{content_type}]")
+        if content_type in _ASSET_POINTER_TYPES:
+            pointer = get("asset_pointer")
+            pointer = pointer.strip() if isinstance(pointer, str) else ""
+            out_append(f"[{content_type}: {pointer}]" if pointer else f"[{content_type}]")
             continue
 
         text = best_effort_text(part)
-        if text:
-            out.append(text)
-        else:
-            out.append(f"[{content_type}]")
+        out_append(text if text else f"[{content_type}]")
 
     return "\n".join(out).strip() or "[multimodal_text]"
 
 
-def extract_text(content: Any) -> str:
-    if not isinstance(content, dict):
-        return ""
+def _text_content_to_text(content: dict[str, Any], content_type: str) -> str:
+    parts = content.get("parts")
+    if isinstance(parts, list):
+        strings = [item for item in parts if isinstance(item, str) and item.strip()]
+        if strings:
+            return "\n".join(strings).strip()
+    text = content.get("text")
+    if isinstance(text, str):
+        return text.strip()
+    return ""
 
-    content_type = content.get("content_type", "unknown")
 
-    if content_type == "text":
-        parts = content.get("parts")
-        if isinstance(parts, list):
-            strings = [item for item in parts if isinstance(item, str) and item.strip()]
-            if strings:
-                return "\n".join(strings).strip()
-        text = content.get("text")
-        if isinstance(text, str):
-            return text.strip()
-        return ""
+def _code_content_to_text(content: dict[str, Any], content_type: str) -> str:
+    text = content.get("text")
+    language = content.get("language")
+    if isinstance(text, str) and text.strip():
+        if isinstance(language, str) and language.strip():
+            return f"```{language.strip()}\n{text.strip()}\n```"
+        return text.strip()
+    return "[code]"
+
+
+def _multimodal_content_to_text(content: dict[str, Any], content_type: str) -> str:
+    return multimodal_parts_to_text(content.get("parts"))
 
-    if content_type == "code":
-        text = content.get("text")
-        language = content.get("language")
-        if isinstance(text, str) and text.strip():
-            if isinstance(language, str) and language.strip():
-                return f"```{language.strip()}\n{text.strip()}\n```"
-            return text.strip()
-        return "[code]"
-
-    if content_type == "multimodal_text":
-        return multimodal_parts_to_text(content.get("parts"))
-
-    if content_type == "reasoning_recap":
-        text = best_effort_text(content)
-        return text if text else "[reasoning_recap]"
-
-    if content_type in {
-        "execution_output",
-        "system_error",
-        "tether_quote",
-        "tether_browsing_display",
-        "thoughts",
-        "app_pairing_content",
-        "user_editable_context",
-    }:
-        text = best_effort_text(content)
-        return text if text else f"[{content_type}]"
 
+def _other_content_to_text(content: dict[str, Any], content_type: str) -> str:
+    # reasoning_recap, execution_output, thoughts, user_editable_context, etc.
     text = best_effort_text(content)
     return text if text else f"[{content_type}]"
 
 
+_CONTENT_HANDLERS = {
+    "text": _text_content_to_text,
+    "code": _code_content_to_text,
+    "multimodal_text": _multimodal_content_to_text,
+}
+
+
+def extract_text(content: Any) -> str:
+    if not isinstance(content, dict):
+        return ""
+
+    content_type = content.get("content_type", "unknown")
+    handler = _CONTENT_HANDLERS.get(content_type, _other_content_to_text)
+    return handler(content, content_type)
+
+
 def extract_model_slug(message: dict[str, Any]) -> str:
     metadata = message.get("metadata")
     if not isinstance(metadata, dict):
@@ -278,18 +433,16 @@ def extract_model_slug(message: dict[str, Any]) -> str:
     for key in ("model_slug", "default_model_slug", "resolved_model_slug"):
         value = metadata.get(key)
         if isinstance(value, str) and value.strip():
-            return value.strip()
+            # A handful of slugs repeat across every message; share one object each.
+            return sys.intern(value.strip())
     return "chatgpt-import"
 
 
-def allowed_role(role: str, include_system: bool, include_tool: bool) -> bool:
-    if role in {"user", "assistant"}:
-        return True
-    if role == "system":
-        return include_system
-    if role == "tool":
-        return include_tool
-    return False
+def node_create_time(node: dict[str, Any]) -> int:
+    message = node.get("message")
+    if not isinstance(message, dict):
+        return 0
+    return as_int_timestamp(message.get("create_time"), 0)
 
 
 def build_chat_payload(
@@ -317,28 +470,40 @@ def build_chat_payload(
     node_id = current_node
 
     if not isinstance(node_id, str) or node_id not in mapping:
-        # Fallback: choose any node with no children as current.
-        for candidate_id, candidate in mapping.items():
-            children = candidate.get("children")
-            if isinstance(children, list) and len(children) == 0:
-                node_id = candidate_id
-                break
-        if not isinstance(node_id, str) or node_id not in mapping:
+        # Fallback: use the most recently created leaf (first one on ties).
+        leaves = [
+            nid
+            for nid, node in mapping.items()
+            if isinstance(node, dict) and node.get("children") == []
+        ]
+        if not leaves:
             return None, stats
-
-    while isinstance(node_id, str) and node_id in mapping and node_id not in visited:
-        visited.add(node_id)
+        node_id = max(leaves, key=lambda nid: node_create_time(mapping[nid]))
+
+    # Only the nodes on the active branch are touched, not the whole mapping;
+    # node_id is known to be in the mapping here, so only parent hops are checked.
+    chain_append = node_chain.append
+    visit = visited.add
+    while node_id not in visited:
+        visit(node_id)
         node = mapping[node_id]
-        node_chain.append(node)
-        parent_id = node.get("parent")
-        if not isinstance(parent_id, str):
+        chain_append(node)
+        parent_id = node.get("parent") if isinstance(node, dict) else None
+        if not isinstance(parent_id, str) or parent_id not in mapping:
             break
         node_id = parent_id
 
     node_chain.reverse()
 
+    allowed_roles = frozenset(
+        ("user", "assistant")
+        + (("system",) if include_system else ())
+        + (("tool",) if include_tool else ())
+    )
+
     messages_map: dict[str, dict[str, Any]] = {}
     ordered_ids: list[str] = []
+    ordered_messages: list[dict[str, Any]] = []
     assistant_models: set[str] = set()
     last_id: str | None = None
 
@@ -352,8 +517,8 @@ def build_chat_payload(
         author = message.get("author")
         role = ""
         if isinstance(author, dict):
-            role = str(author.get("role", "")).strip()
-        if not allowed_role(role, include_system, include_tool):
+            role = sys.intern(str(author.get("role", "")).strip())
+        if role not in allowed_roles:
             continue
 
         content = extract_text(message.get("content"))
@@ -369,9 +534,13 @@ def build_chat_payload(
         if message_id in messages_map:
             message_id = f"{message_id}-{len(ordered_ids) + 1}"
 
-        timestamp = as_int_timestamp(message.get("create_time"), convo_ts)
+        create_time = message.get("create_time")
+        if type(create_time) is float and math.isfinite(create_time):
+            timestamp = int(create_time)
+        else:
+            timestamp = as_int_timestamp(create_time, convo_ts)
 
-        converted = {
+        converted: dict[str, Any] = {
             "id": message_id,
             "parentId": last_id,
             "childrenIds": [],
@@ -383,16 +552,18 @@ def build_chat_payload(
             "context": None,
         }
 
-        if last_id is not None and last_id in messages_map:
-            messages_map[last_id]["childrenIds"].append(message_id)
-
         messages_map[message_id] = converted
         ordered_ids.append(message_id)
+        ordered_messages.append(converted)
         last_id = message_id
 
     if not ordered_ids:
         return None, stats
 
+    # The flattened branch is linear: each message's only child is the next one.
+    for parent_message, child_id in zip(ordered_messages, ordered_ids[1:]):
+        parent_message["childrenIds"] = [child_id]
+
     stats["converted_messages"] = len(ordered_ids)
 
     chat_obj = {
@@ -402,7 +573,7 @@ def build_chat_payload(
             "messages": messages_map,
         },
         "models": sorted(assistant_models) if assistant_models else ["chatgpt-import"],
-        "messages": [messages_map[msg_id] for msg_id in ordered_ids],
+        "messages": ordered_messages,
         "options": {},
         "timestamp": convo_ts,
     }
@@ -410,62 +581,356 @@ def build_chat_payload(
     return chat_obj, stats
 
 
-def post_import(
-    base_url: str, token: str | None, payload: dict[str, Any]
-) -> list[dict[str, Any]]:
-    endpoint = f"{base_url.rstrip('/')}/chats/import"
-    body = json.dumps(payload).encode("utf-8")
+def get_http_client() -> Any:
+    # One client for the whole run so every API call reuses the same connection.
+    global _http_client
+    if _http_client is None:
+        try:
+            _http_client = httpx.Client(http2=True, follow_redirects=True)
+        except ImportError:  # http2 support needs the optional h2 package.
+            _http_client = httpx.Client(follow_redirects=True)
+    return _http_client
+
+
+def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+
+def http_request(
+    method: str,
+    url: str,
+    *,
+    headers: dict[str, str],
+    body: bytes | None = None,
+    timeout: float = 120,
+) -> bytes:
+    attempt = 1
+    while True:
+        try:
+            if httpx is not None:
+                return httpx_request(method, url, headers=headers, body=body, timeout=timeout)
+            return keepalive_request(method, url, headers=headers, body=body, timeout=timeout)
+        except error.HTTPError as exc:
+            if not should_retry(method, exc.code, attempt):
+                raise
+        time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        attempt += 1
+
+
+def http_request_chunks(
+    method: str,
+    url: str,
+    *,
+    headers: dict[str, str],
+    body: bytes | None = None,
+    timeout: float = 120,
+) -> Iterator[bytes]:
+    """Yield the response body in pieces so large responses can be parsed as they arrive."""
+    if httpx is None:
+        # http.client responses are read whole to keep the connection reusable.
+        yield http_request(method, url, headers=headers, body=body, timeout=timeout)
+        return
+
+    attempt = 1
+    while True:
+        with get_http_client().stream(
+            method, url, headers=headers, content=body, timeout=timeout
+        ) as resp:
+            if not resp.is_error:
+                yield from resp.iter_bytes()
+                return
+            if not should_retry(method, resp.status_code, attempt):
+                raise error.HTTPError(
+                    url, resp.status_code, resp.reason_phrase, Message(), io.BytesIO(resp.read())
+                )
+        time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        attempt += 1
 
+
+def should_retry(method: str, status: int, attempt: int) -> bool:
+    return method == "GET" and status in RETRY_STATUSES and attempt < RETRY_ATTEMPTS
+
+
+def keepalive_request(
+    method: str,
+    url: str,
+    *,
+    headers: dict[str, str],
+    body: bytes | None,
+    timeout: float,
+    redirects: int = 5,
+) -> bytes:
+    parts = parse.urlsplit(url)
+    if parts.scheme in request.getproxies() and not request.proxy_bypass(parts.hostname or ""):
+        # http.client does not speak to proxies; let urllib handle that setup.
+        req = request.Request(url, data=body, method=method, headers=headers)
+        with request.urlopen(req, timeout=timeout) as resp:
+            return resp.read()
+
+    key = (parts.scheme, parts.netloc, threading.get_ident())
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    headers = {**headers, "Accept-Encoding": "gzip", "Connection": "keep-alive"}
+
+    while True:
+        conn = _connections.get(key)
+        reused = conn is not None
+        if conn is None:
+            conn_cls = (
+                http.client.HTTPSConnection
+                if parts.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            conn = _connections[key] = conn_cls(parts.netloc, timeout=timeout)
+        elif conn.sock is not None:
+            if select.select([conn.sock], [], [], 0)[0]:
+                # An idle keep-alive socket only turns readable once the server
+                # has closed it; http.client reconnects on the next request.
+                conn.close()
+                reused = False
+            else:
+                conn.sock.settimeout(timeout)
+
+        try:
+            conn.request(method, path, body=body, headers=headers)
+        except (ConnectionResetError, BrokenPipeError):
+            conn.close()
+            del _connections[key]
+            if not reused:
+                raise
+            # The request never got through on a stale socket; resend it on a fresh one.
+            continue
+        except Exception:
+            conn.close()
+            del _connections[key]
+            raise
+
+        try:
+            resp = conn.getresponse()
+            data = resp.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            del _connections[key]
+            if not reused or method != "GET":
+                # A POST may already have been stored; resending it could
+                # create duplicate chats.
+                raise
+            continue
+        except Exception:
+            conn.close()
+            del _connections[key]
+            raise
+        break
+
+    if resp.will_close:
+        conn.close()
+        del _connections[key]
+    if resp.getheader("Content-Encoding") == "gzip":
+        data = gzip.decompress(data)
+
+    location = resp.getheader("Location")
+    if method == "GET" and resp.status in (301, 302, 303, 307, 308) and location and redirects:
+        return keepalive_request(
+            method,
+            parse.urljoin(url, location),
+            headers=headers,
+            body=body,
+            timeout=timeout,
+            redirects=redirects - 1,
+        )
+    if resp.status >= 300:
+        raise error.HTTPError(url, resp.status, resp.reason, resp.msg, io.BytesIO(data))
+    return data
+
+
+def httpx_request(
+    method: str,
+    url: str,
+    *,
+    headers: dict[str, str],
+    body: bytes | None,
+    timeout: float,
+) -> bytes:
+    resp = get_http_client().request(
+        method, url, content=body, headers=headers, timeout=timeout
+    )
+    if resp.is_error:
+        # Keep error handling uniform with the http.client path.
+        raise error.HTTPError(
+            url, resp.status_code, resp.reason_phrase, Message(), io.BytesIO(resp.content)
+        )
+    return resp.content
+
+
+def convert_conversations(
+    conversations: Iterable[dict[str, Any]],
+    *,
+    workers: int,
+    chunksize: int,
+    prefetch: bool,
+    include_system: bool,
+    include_tool: bool,
+    keep_empty: bool,
+) -> Iterator[tuple[dict[str, Any], dict[str, Any] | None, dict[str, Any]]]:
+    convert = functools.partial(
+        build_chat_payload,
+        include_system=include_system,
+        include_tool=include_tool,
+        keep_empty=keep_empty,
+    )
+
+    if workers <= 1:
+        for convo in conversations:
+            chat_obj, stats = convert(convo)
+            yield convo, chat_obj, stats
+        return
+
+    # Submit bounded batches so a small --count does not convert the whole
+    # export up front; results keep source order. With `prefetch` the next
+    # batch is already submitted while the current one drains, so the pool
+    # does not idle. The pool may be created on a background thread, where
+    # fork() is unsafe, so workers are started from a clean process instead.
+    start_method = (
+        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    )
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(start_method)
+    )
+    pending = iter(conversations)
+
+    def submit() -> tuple[list[dict[str, Any]], Iterator[Any]]:
+        batch = list(itertools.islice(pending, workers * chunksize))
+        return batch, executor.map(convert, batch, chunksize=chunksize)
+
+    try:
+        batch, results = submit()
+        while batch:
+            upcoming = submit() if prefetch else None
+            for convo, (chat_obj, stats) in zip(batch, results):
+                yield convo, chat_obj, stats
+            batch, results = upcoming or submit()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def import_headers(token: str | None) -> dict[str, str]:
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
     }
     if token and token.strip():
         headers["Authorization"] = f"Bearer {token.strip()}"
+    return headers
 
-    req = request.Request(
-        endpoint,
-        data=body,
-        method="POST",
-        headers=headers,
-    )
 
-    with request.urlopen(req, timeout=120) as resp:
-        data = resp.read().decode("utf-8")
-        parsed = json.loads(data)
-        if not isinstance(parsed, list):
-            raise RuntimeError("Unexpected response shape from /chats/import")
-        return parsed
+def post_import(base_url: str, token: str | None, body: bytes) -> list[dict[str, Any]]:
+    endpoint = f"{base_url.rstrip('/')}/chats/import"
+
+    parsed = json_loads(http_request("POST", endpoint, headers=import_headers(token), body=body))
+    if not isinstance(parsed, list):
+        raise RuntimeError("Unexpected response shape from /chats/import")
+    return parsed
 
 
-def get_all_chats(base_url: str, token: str) -> list[dict[str, Any]]:
+def post_import_count(base_url: str, token: str | None, body: bytes) -> int:
+    """Like post_import, but only counts the imported chats the server echoes back."""
+    if ijson is None:
+        return len(post_import(base_url, token, body))
+
+    endpoint = f"{base_url.rstrip('/')}/chats/import"
+    chunks = http_request_chunks("POST", endpoint, headers=import_headers(token), body=body)
+    try:
+        return count_json_items(chunks)
+    except ijson.JSONError as exc:
+        raise RuntimeError("Unexpected response shape from /chats/import") from exc
+
+
+def iter_all_chat_metas(base_url: str, token: str) -> Iterator[Any]:
     endpoint = f"{base_url.rstrip('/')}/chats/all"
 
-    req = request.Request(
+    chunks = http_request_chunks(
+        "GET",
         endpoint,
-        method="GET",
         headers={
             "Accept": "application/json",
             "Authorization": f"Bearer {token.strip()}",
         },
     )
 
-    with request.urlopen(req, timeout=120) as resp:
-        data = resp.read().decode("utf-8")
-        parsed = json.loads(data)
+    if ijson is None:
+        parsed = json_loads(b"".join(chunks))
         if not isinstance(parsed, list):
             raise RuntimeError("Unexpected response shape from /chats/all")
-        return parsed
+        for chat in parsed:
+            if isinstance(chat, dict):
+                yield chat.get("meta")
+        return
+
+    # Only each chat's small meta object is built; full chat bodies are skipped
+    # by the parser instead of being materialized.
+    first = next((chunk for chunk in chunks if chunk.strip()), b"")
+    if not first.lstrip().startswith(b"["):
+        raise RuntimeError("Unexpected response shape from /chats/all")
+    yield from iter_json_items(itertools.chain((first,), chunks), "item.meta")
+
+
+def iter_json_items(chunks: Iterable[bytes], prefix: str) -> Iterator[Any]:
+    items = ijson.sendable_list()
+    coro = ijson.items_coro(items, prefix, use_float=True)
+    for chunk in chunks:
+        # ijson treats an empty chunk as end of input.
+        if not chunk:
+            continue
+        coro.send(chunk)
+        yield from items
+        del items[:]
+    coro.close()
+    yield from items
+
+
+def count_json_items(chunks: Iterable[bytes]) -> int:
+    """Count the items of a top-level JSON array from parser events alone."""
+    events = ijson.sendable_list()
+    coro = ijson.basic_parse_coro(events, use_float=True)
+    depth = 0
+    count = 0
+
+    def drain() -> None:
+        nonlocal depth, count
+        for event, _ in events:
+            if event == "end_map" or event == "end_array":
+                depth -= 1
+                continue
+            if depth == 0 and event != "start_array":
+                raise ijson.JSONError("top-level value is not an array")
+            if depth == 1:
+                count += 1
+            if event == "start_map" or event == "start_array":
+                depth += 1
+        del events[:]
+
+    for chunk in chunks:
+        # ijson treats an empty chunk as end of input.
+        if not chunk:
+            continue
+        coro.send(chunk)
+        drain()
+    coro.close()
+    drain()
+    return count
 
 
 def fetch_existing_imported_source_ids(base_url: str, token: str) -> set[str]:
-    chats = get_all_chats(base_url, token)
     source_ids: set[str] = set()
 
-    for chat in chats:
-        if not isinstance(chat, dict):
-            continue
-        meta = chat.get("meta")
+    for meta in iter_all_chat_metas(base_url, token):
         if not isinstance(meta, dict):
             continue
         if meta.get("import_source") != "chatgpt-gdpr":
@@ -479,24 +944,22 @@ def fetch_existing_imported_source_ids(base_url: str, token: str) -> set[str]:
 
 def signin(base_url: str, email: str, password: str) -> str:
     endpoint = f"{base_url.rstrip('/')}/auths/signin"
-    body = json.dumps({"email": email, "password": password}).encode("utf-8")
+    body = json_dumps({"email": email, "password": password})
 
-    req = request.Request(
+    data = http_request(
+        "POST",
         endpoint,
-        data=body,
-        method="POST",
         headers={
             "Accept": "application/json",
             "Content-Type": "application/json",
         },
+        body=body,
+        timeout=60,
     )
-
-    with request.urlopen(req, timeout=60) as resp:
-        data = resp.read().decode("utf-8")
-        parsed = json.loads(data)
-        if not isinstance(parsed, dict) or not isinstance(parsed.get("token"), str):
-            raise RuntimeError("Unexpected response shape from /auths/signin")
-        return parsed["token"].strip()
+    parsed = json_loads(data)
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("token"), str):
+        raise RuntimeError("Unexpected response shape from /auths/signin")
+    return parsed["token"].strip()
 
 
 def resolve_token(args: argparse.Namespace) -> str | None:
@@ -514,6 +977,134 @@ def resolve_token(args: argparse.Namespace) -> str | None:
     return None
 
 
+def source_is_array(path: str) -> bool:
+    # Cheap shape check for the streaming path, which never sees the whole document.
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return False
+            head = chunk.lstrip()
+            if head:
+                return head.startswith(b"[")
+
+
+def iter_conversations(path: str) -> Iterator[Any]:
+    # Unbuffered: ijson already reads in large chunks, so skip the extra copy.
+    with open(path, "rb", buffering=0) as f:
+        yield from ijson.items(f, "item", use_float=True, buf_size=STREAM_READ_SIZE)
+
+
+def iter_eligible(
+    conversations: Iterable[Any],
+    imported_state_ids: set[str],
+    existing_source_ids: set[str],
+    skipped: dict[str, int],
+) -> Iterator[dict[str, Any]]:
+    for convo in conversations:
+        if not isinstance(convo, dict):
+            continue
+
+        source_id = str(convo.get("id", ""))
+        if source_id and source_id in imported_state_ids:
+            skipped["state"] += 1
+            continue
+
+        if source_id and source_id in existing_source_ids:
+            skipped["existing"] += 1
+            continue
+
+        # Nothing to convert; keep these away from the payload builder.
+        mapping = convo.get("mapping")
+        if not isinstance(mapping, dict) or not mapping:
+            skipped["unconvertible"] += 1
+            continue
+
+        yield convo
+
+
+def iter_stream_sample(
+    path: str,
+    k: int,
+    rng: random.Random,
+    imported_state_ids: set[str],
+    existing_source_ids: set[str],
+    skipped: dict[str, int],
+) -> Iterator[dict[str, Any]]:
+    """Eligible conversations of a streamed export, in random order.
+
+    Each pass re-reads the source and draws a reservoir from the conversations
+    not tried yet, so another pass only happens when the consumer still needs
+    more after a sample turned out mostly unconvertible. Conversations are
+    told apart by their position in the eligible stream, not by id.
+    """
+    tried: set[int] = set()
+    counts = skipped
+    while True:
+        eligible = iter_eligible(
+            iter_conversations(path), imported_state_ids, existing_source_ids, counts
+        )
+        untried = ((pos, convo) for pos, convo in enumerate(eligible) if pos not in tried)
+        sample = reservoir_sample(untried, k, rng)
+        rng.shuffle(sample)
+        # Later passes see the same skips again; count them once.
+        counts = {key: 0 for key in skipped}
+        for pos, convo in sample:
+            tried.add(pos)
+            yield convo
+        if len(sample) < k:
+            return
+        k *= 2
+
+
+def iter_shuffled_indices(n: int, rng: random.Random) -> Iterator[int]:
+    # Lazy random permutation of range(n): small --count values only draw a few
+    # indices instead of shuffling all of them. Once half the indices are used,
+    # rejection sampling gets wasteful, so shuffle the remainder instead.
+    tried: set[int] = set()
+    while len(tried) * 2 < n:
+        idx = rng.randrange(n)
+        if idx in tried:
+            continue
+        tried.add(idx)
+        yield idx
+
+    remaining = [idx for idx in range(n) if idx not in tried]
+    rng.shuffle(remaining)
+    yield from remaining
+
+
+def reservoir_sample(items: Iterable[Any], k: int, rng: random.Random) -> list[Any]:
+    # Algorithm L: uniform sample of k items in one pass with O(k) memory. Skips
+    # ahead geometrically, so only O(k log(N/k)) random numbers are drawn
+    # instead of one per item.
+    iterator = iter(items)
+    reservoir = list(itertools.islice(iterator, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+
+    missing = object()
+    w = math.exp(math.log(random_open_unit(rng)) / k)
+    while True:
+        if w < 1.0:
+            skip = math.floor(math.log(random_open_unit(rng)) / math.log1p(-w))
+        else:
+            skip = 0
+        item = next(itertools.islice(iterator, skip, None), missing)
+        if item is missing:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(random_open_unit(rng)) / k)
+
+
+def random_open_unit(rng: random.Random) -> float:
+    # rng.random() is in [0, 1); the logarithms above need (0, 1).
+    while True:
+        value = rng.random()
+        if value > 0.0:
+            return value
+
+
 def load_state_ids(path: str | None) -> set[str]:
     if not path:
         return set()
@@ -529,8 +1120,12 @@ def load_state_ids(path: str | None) -> set[str]:
     return out
 
 
-def append_state_ids(path: str | None, ids: list[str]) -> None:
-    if not path or not ids:
+@contextlib.contextmanager
+def open_state_file(path: str | None) -> Iterator[TextIO | None]:
+    # Opened once per run; append_state_ids flushes after every write and the
+    # file is fsynced on close.
+    if not path:
+        yield None
         return
 
     parent = os.path.dirname(path)
@@ -538,9 +1133,237 @@ def append_state_ids(path: str | None, ids: list[str]) -> None:
         os.makedirs(parent, exist_ok=True)
 
     with open(path, "a", encoding="utf-8") as f:
-        for source_id in ids:
-            if source_id:
-                f.write(f"{source_id}\n")
+        try:
+            yield f
+        finally:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def append_state_ids(state: TextIO | None, ids: list[str]) -> None:
+    if state is None or not ids:
+        return
+
+    state.writelines(f"{source_id}\n" for source_id in ids if source_id)
+    state.flush()
+
+
+def build_import_form(convo: dict[str, Any], chat_obj: dict[str, Any]) -> dict[str, Any]:
+    created_at = as_int_timestamp(convo.get("create_time"))
+    updated_at = as_int_timestamp(convo.get("update_time"), created_at)
+
+    return {
+        "chat": chat_obj,
+        "meta": {
+            "import_source": "chatgpt-gdpr",
+            "conversation_id": convo.get("id"),
+            "original_title": convo.get("title"),
+        },
+        "pinned": False,
+        "folder_id": None,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+def iter_selected(
+    eligible: Iterable[dict[str, Any]],
+    *,
+    target_count: int | None,
+    workers: int,
+    include_system: bool,
+    include_tool: bool,
+    keep_empty: bool,
+) -> Iterator[tuple[bytes, dict[str, Any]]]:
+    """Yield (encoded form, stats) pairs; each form is serialized exactly once."""
+    chunksize = CONVERT_CHUNKSIZE
+    if target_count is not None:
+        # A pool only pays off with enough to convert; a small --count (like the
+        # default pilot) runs in-process and never converts far past its target.
+        workers = min(workers, math.ceil(target_count / CONVERT_CHUNKSIZE))
+        chunksize = min(CONVERT_CHUNKSIZE, math.ceil(target_count / workers))
+
+    selected = 0
+    for convo, chat_obj, stats in convert_conversations(
+        eligible,
+        workers=workers,
+        chunksize=chunksize,
+        prefetch=target_count is None,
+        include_system=include_system,
+        include_tool=include_tool,
+        keep_empty=keep_empty,
+    ):
+        if chat_obj is None:
+            continue
+
+        yield json_dumps(build_import_form(convo, chat_obj)), stats
+        selected += 1
+
+        if target_count is not None and selected >= target_count:
+            return
+
+
+@contextlib.contextmanager
+def open_spool(args: argparse.Namespace) -> Iterator[tuple[BinaryIO | None, str | None]]:
+    # The spool only feeds --output (or is kept on request); otherwise nothing
+    # is written to disk.
+    if args.spool_path:
+        with open(args.spool_path, "wb") as f:
+            yield f, args.spool_path
+        return
+
+    if not args.output:
+        yield None, None
+        return
+
+    fd, path = tempfile.mkstemp(prefix="chatgpt-import-", suffix=".ndjson")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f, path
+    finally:
+        os.remove(path)
+
+
+def iter_spooled(
+    selected: Iterable[tuple[bytes, dict[str, Any]]],
+    spool: BinaryIO | None,
+    stats: list[dict[str, Any]],
+) -> Iterator[tuple[bytes, dict[str, Any]]]:
+    # Forms go to disk as NDJSON; only the small per-chat stats stay in memory.
+    for form, stat in selected:
+        if spool is not None:
+            spool.write(form)
+            spool.write(b"\n")
+        stats.append(stat)
+        yield form, stat
+
+
+def write_output(args: argparse.Namespace, selected_forms: list[bytes]) -> None:
+    if args.output:
+        write_forms(args.output, selected_forms, args.pretty_output)
+
+
+def write_output_from_spool(args: argparse.Namespace, spool_path: str) -> None:
+    if not args.output:
+        return
+
+    with open(spool_path, "rb") as spool:
+        write_forms(args.output, (line.rstrip(b"\n") for line in spool), args.pretty_output)
+
+
+def write_forms(path: str, forms: Iterable[bytes], pretty: bool) -> None:
+    """Write {"chats": [...]} by splicing encoded forms, one form in memory at a time."""
+    with open(path, "wb") as f:
+        f.write(b'{\n  "chats": [' if pretty else b'{"chats":[')
+        for i, form in enumerate(forms):
+            if pretty:
+                # Re-indent each form to where it sits inside the full document.
+                form_text = json_dumps(json_loads(form), indent=True)
+                f.write(b"\n" if i == 0 else b",\n")
+                f.write(b"\n".join(b"    " + row for row in form_text.split(b"\n")))
+            else:
+                if i:
+                    f.write(b",")
+                f.write(form)
+        f.write(b"\n  ]\n}\n" if pretty else b"]}\n")
+    print(f"Wrote payload: {path}")
+
+
+def run_import(
+    args: argparse.Namespace,
+    token: str | None,
+    to_import: Iterable[tuple[bytes, dict[str, Any]]],
+) -> tuple[int, int] | None:
+    try:
+        with open_state_file(args.state_file) as state:
+            return import_with_chunks(
+                base_url=args.base_url,
+                token=token,
+                selected=to_import,
+                chunk_size=args.chunk_size,
+                concurrency=args.concurrency,
+                continue_on_error=args.continue_on_error,
+                state=state,
+            )
+    except error.HTTPError as exc:
+        body = exc.read().decode("utf-8", errors="replace")
+        print(f"HTTP ERROR {exc.code} during import: {body}", file=sys.stderr)
+        return None
+    except Exception as exc:
+        print(f"ERROR during import: {exc}", file=sys.stderr)
+        return None
+
+
+def finish_import(
+    args: argparse.Namespace, imported_count: int, failed_count: int, selected_count: int
+) -> int:
+    print(
+        f"Import finished: imported={imported_count} failed={failed_count} "
+        f"selected={selected_count}"
+    )
+
+    if failed_count > 0 and args.continue_on_error:
+        return 0
+    return 1 if failed_count > 0 else 0
+
+
+def import_all_spooled(
+    args: argparse.Namespace,
+    token: str | None,
+    selected: Iterable[tuple[bytes, dict[str, Any]]],
+    skipped: dict[str, int],
+) -> int:
+    """--count 0: convert, spool and (unless --dry-run) upload in one streaming pass."""
+    selected_stats: list[dict[str, Any]] = []
+    result: tuple[int, int] | None = None
+    with open_spool(args) as (spool, spool_path):
+        if args.dry_run:
+            spooled = iter_spooled(selected, spool, selected_stats)
+        else:
+            # Chunks are posted while later conversations are still being
+            # converted; there is no requested count to fall short of. With
+            # --chunk-size 0 the single request body still holds every chat.
+            spooled = iter_spooled(
+                iter_in_background(selected, maxsize=max(2 * args.chunk_size, 2)),
+                spool,
+                selected_stats,
+            )
+            result = run_import(args, token, spooled)
+        if result is None and (args.dry_run or spool is not None):
+            # Everything on --dry-run; after a failed import, the rest of the
+            # selection still goes to --output so the payload can be inspected.
+            for _ in spooled:
+                pass
+
+        if len(selected_stats) == 0:
+            print("No conversations selected. Nothing to import.")
+            return 0 if args.dry_run or result is not None else 1
+
+        if spool is not None and spool_path is not None:
+            spool.flush()
+            write_output_from_spool(args, spool_path)
+
+    print_selection_summary(selected_stats, args.summary_limit)
+    print_skipped(skipped)
+
+    if args.dry_run:
+        print("Dry run only. No import API call made.")
+        return 0
+    if result is None:
+        return 1
+
+    imported_count, failed_count = result
+    return finish_import(args, imported_count, failed_count, len(selected_stats))
+
+
+def print_skipped(skipped: dict[str, int]) -> None:
+    if skipped["state"] or skipped["existing"]:
+        print(
+            "Skipped already imported: "
+            f"state_file={skipped['state']} openwebui={skipped['existing']}"
+        )
+    if skipped["unconvertible"]:
+        print(f"Skipped unconvertible (empty mapping): {skipped['unconvertible']}")
 
 
 def print_selection_summary(selected_stats: list[dict[str, Any]], summary_limit: int) -> None:
@@ -562,45 +1385,99 @@ def print_selection_summary(selected_stats: list[dict[str, Any]], summary_limit:
         print(f"  ... ({omitted} more not shown)")
 
 
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    # size <= 0 means everything in a single batch.
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size)) if size > 0 else list(iterator)
+        if not batch:
+            return
+        yield batch
+
+
+def iter_in_background(items: Iterable[Any], maxsize: int) -> Iterator[Any]:
+    """Produce `items` on a worker thread, handing them over through a bounded queue."""
+    q: queue.Queue[Any] = queue.Queue(maxsize=maxsize)
+    done = object()
+    stop = threading.Event()
+    failure: list[BaseException] = []
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            failure.append(exc)
+        put(done)
+
+    thread = threading.Thread(target=produce, name="convert", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+    if failure:
+        raise failure[0]
+
+
 def import_with_chunks(
     *,
     base_url: str,
-    token: str,
-    selected_forms: list[dict[str, Any]],
-    selected_stats: list[dict[str, Any]],
+    token: str | None,
+    selected: Iterable[tuple[bytes, dict[str, Any]]],
     chunk_size: int,
+    concurrency: int,
     continue_on_error: bool,
-    state_file: str | None,
+    state: TextIO | None,
 ) -> tuple[int, int]:
-    if chunk_size <= 0:
-        chunk_size = len(selected_forms)
+    """Upload (encoded form, stats) pairs in chunks as they arrive from `selected`.
 
+    With `concurrency` > 1, up to that many chunks are in flight at once and
+    finish in any order; state IDs are appended as each upload succeeds.
+    """
     imported_count = 0
     failed_count = 0
-    total = len(selected_forms)
+    lock = threading.Lock()
 
-    for start in range(0, total, chunk_size):
-        end = min(start + chunk_size, total)
-        forms_chunk = selected_forms[start:end]
-        stats_chunk = selected_stats[start:end]
-        payload = {"chats": forms_chunk}
+    def upload(batch_no: int, batch: list[tuple[bytes, dict[str, Any]]]) -> None:
+        nonlocal imported_count, failed_count
+        forms_chunk = [form for form, _ in batch]
+        stats_chunk = [stat for _, stat in batch]
+        chunk_body = encode_chats(forms_chunk)
 
         try:
-            imported = post_import(base_url, token, payload)
-            imported_count += len(imported)
-            append_state_ids(
-                state_file,
-                [str(item.get("source_id", "")) for item in stats_chunk],
-            )
-            print(
-                f"Imported batch {start // chunk_size + 1}: {len(imported)}/{len(forms_chunk)} chats "
-                f"(running total: {imported_count})"
-            )
-            continue
+            imported = post_import_count(base_url, token, chunk_body)
+            with lock:
+                imported_count += imported
+                append_state_ids(
+                    state,
+                    [str(item.get("source_id", "")) for item in stats_chunk],
+                )
+                print(
+                    f"Imported batch {batch_no}: {imported}/{len(forms_chunk)} chats "
+                    f"(running total: {imported_count})"
+                )
+            return
         except error.HTTPError as exc:
             body = exc.read().decode("utf-8", errors="replace")
             print(
-                f"HTTP ERROR {exc.code} in batch {start // chunk_size + 1} "
+                f"HTTP ERROR {exc.code} in batch {batch_no} "
                 f"(size={len(forms_chunk)}): {body}",
                 file=sys.stderr,
             )
@@ -608,7 +1485,7 @@ def import_with_chunks(
                 raise
         except Exception as exc:
             print(
-                f"ERROR in batch {start // chunk_size + 1} (size={len(forms_chunk)}): {exc}",
+                f"ERROR in batch {batch_no} (size={len(forms_chunk)}): {exc}",
                 file=sys.stderr,
             )
             if not continue_on_error:
@@ -616,31 +1493,53 @@ def import_with_chunks(
 
         # Fallback path: try each chat individually.
         for form, stat in zip(forms_chunk, stats_chunk):
-            single_payload = {"chats": [form]}
+            single_body = encode_chats([form])
             source_id = str(stat.get("source_id", ""))
             source_title = stat.get("source_title")
             try:
-                imported = post_import(base_url, token, single_payload)
-                imported_count += len(imported)
-                append_state_ids(state_file, [source_id])
-                print(
-                    f"  imported single id={source_id} title={source_title!r} "
-                    f"(running total: {imported_count})"
-                )
+                imported = post_import_count(base_url, token, single_body)
+                with lock:
+                    imported_count += imported
+                    append_state_ids(state, [source_id])
+                    print(
+                        f"  imported single id={source_id} title={source_title!r} "
+                        f"(running total: {imported_count})"
+                    )
             except error.HTTPError as exc:
                 body = exc.read().decode("utf-8", errors="replace")
-                failed_count += 1
+                with lock:
+                    failed_count += 1
                 print(
                     f"  FAILED id={source_id} title={source_title!r} HTTP {exc.code}: {body}",
                     file=sys.stderr,
                 )
             except Exception as exc:
-                failed_count += 1
+                with lock:
+                    failed_count += 1
                 print(
                     f"  FAILED id={source_id} title={source_title!r}: {exc}",
                     file=sys.stderr,
                 )
 
+    batches = enumerate(iter_batches(selected, chunk_size), start=1)
+    if concurrency <= 1:
+        for batch_no, batch in batches:
+            upload(batch_no, batch)
+        return imported_count, failed_count
+
+    # Batches are still produced on this thread; only `concurrency` of them are
+    # held in memory at a time.
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="upload") as executor:
+        in_flight: set[Future[None]] = set()
+        for batch_no, batch in batches:
+            if len(in_flight) >= concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            in_flight.add(executor.submit(upload, batch_no, batch))
+        for future in wait(in_flight).done:
+            future.result()
+
     return imported_count, failed_count
 
 
@@ -655,17 +1554,39 @@ def main() -> int:
         print("ERROR: --chunk-size must be >= 0", file=sys.stderr)
         return 2
 
+    if args.workers < 1:
+        print("ERROR: --workers must be >= 1", file=sys.stderr)
+        return 2
+
+    if args.concurrency < 1:
+        print("ERROR: --concurrency must be >= 1", file=sys.stderr)
+        return 2
+
+    if args.spool_path and args.count != 0:
+        print("ERROR: --spool-path only applies with --count 0", file=sys.stderr)
+        return 2
+
     if not os.path.isfile(args.source):
         print(f"ERROR: source file not found: {args.source}", file=sys.stderr)
         return 2
 
-    with open(args.source, "r", encoding="utf-8") as f:
-        conversations = json.load(f)
-
-    if not isinstance(conversations, list):
-        print("ERROR: source JSON must be an array of conversations", file=sys.stderr)
+    if args.stream and ijson is None:
+        print("ERROR: --stream requires the ijson package", file=sys.stderr)
         return 2
 
+    conversations: list[Any] | None = None
+    if ijson is not None:
+        if not source_is_array(args.source):
+            print("ERROR: source JSON must be an array of conversations", file=sys.stderr)
+            return 2
+    else:
+        with open(args.source, "rb") as f:
+            conversations = json_loads(f.read())
+
+        if not isinstance(conversations, list):
+            print("ERROR: source JSON must be an array of conversations", file=sys.stderr)
+            return 2
+
     token: str | None = None
     existing_source_ids_in_openwebui: set[str] = set()
 
@@ -716,92 +1637,37 @@ def main() -> int:
         )
 
     rng = random.Random(args.seed)
-    candidate_indices = list(range(len(conversations)))
-    if not args.no_shuffle:
-        rng.shuffle(candidate_indices)
-
-    selected_forms: list[dict[str, Any]] = []
-    selected_stats: list[dict[str, Any]] = []
     target_count: int | None = None if args.count == 0 else args.count
-    skipped_by_state = 0
-    skipped_by_existing = 0
-
-    for idx in candidate_indices:
-        convo = conversations[idx]
-        if not isinstance(convo, dict):
-            continue
-
-        source_id = str(convo.get("id", ""))
-        if source_id and source_id in imported_state_ids:
-            skipped_by_state += 1
-            continue
 
-        if source_id and source_id in existing_source_ids_in_openwebui:
-            skipped_by_existing += 1
-            continue
-
-        chat_obj, stats = build_chat_payload(
-            convo,
-            include_system=args.include_system,
-            include_tool=args.include_tool,
-            keep_empty=args.keep_empty,
+    candidates: Iterable[Any]
+    if conversations is not None:
+        if args.no_shuffle:
+            candidates = conversations
+        else:
+            candidates = (
+                conversations[idx] for idx in iter_shuffled_indices(len(conversations), rng)
+            )
+    else:
+        candidates = iter_conversations(args.source)
+
+    skipped = {"state": 0, "existing": 0, "unconvertible": 0}
+    eligible: Iterable[dict[str, Any]]
+    if conversations is None and target_count is not None and not args.no_shuffle:
+        # Streaming: sample without holding the whole export in memory.
+        eligible = iter_stream_sample(
+            args.source,
+            target_count * STREAM_OVERSAMPLE,
+            rng,
+            imported_state_ids,
+            existing_source_ids_in_openwebui,
+            skipped,
         )
-        if chat_obj is None:
-            continue
-
-        created_at = as_int_timestamp(convo.get("create_time"))
-        updated_at = as_int_timestamp(convo.get("update_time"), created_at)
-
-        selected_forms.append(
-            {
-                "chat": chat_obj,
-                "meta": {
-                    "import_source": "chatgpt-gdpr",
-                    "conversation_id": convo.get("id"),
-                    "original_title": convo.get("title"),
-                },
-                "pinned": False,
-                "folder_id": None,
-                "created_at": created_at,
-                "updated_at": updated_at,
-            }
+    else:
+        eligible = iter_eligible(
+            candidates, imported_state_ids, existing_source_ids_in_openwebui, skipped
         )
-        selected_stats.append(stats)
 
-        if target_count is not None and len(selected_forms) >= target_count:
-            break
-
-    if target_count is not None and len(selected_forms) < target_count:
-        print(
-            f"ERROR: only found {len(selected_forms)} convertible conversations "
-            f"(requested {target_count})",
-            file=sys.stderr,
-        )
-        return 1
-
-    if len(selected_forms) == 0:
-        print("No conversations selected. Nothing to import.")
-        return 0
-
-    payload = {"chats": selected_forms}
-
-    if args.output:
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
-        print(f"Wrote payload: {args.output}")
-
-    print_selection_summary(selected_stats, args.summary_limit)
-    if skipped_by_state or skipped_by_existing:
-        print(
-            "Skipped already imported: "
-            f"state_file={skipped_by_state} openwebui={skipped_by_existing}"
-        )
-
-    if args.dry_run:
-        print("Dry run only. No import API call made.")
-        return 0
-
-    if not token:
+    if not args.dry_run and not token:
         try:
             token = resolve_token(args)
         except error.HTTPError as exc:
@@ -819,33 +1685,49 @@ def main() -> int:
             )
             return 2
 
-    try:
-        imported_count, failed_count = import_with_chunks(
-            base_url=args.base_url,
-            token=token,
-            selected_forms=selected_forms,
-            selected_stats=selected_stats,
-            chunk_size=args.chunk_size,
-            continue_on_error=args.continue_on_error,
-            state_file=args.state_file,
+    selected = iter_selected(
+        eligible,
+        target_count=target_count,
+        workers=args.workers,
+        include_system=args.include_system,
+        include_tool=args.include_tool,
+        keep_empty=args.keep_empty,
+    )
+    if target_count is None:
+        return import_all_spooled(args, token, selected, skipped)
+
+    selected_forms: list[bytes] = []
+    selected_stats: list[dict[str, Any]] = []
+    for form, stats in selected:
+        selected_forms.append(form)
+        selected_stats.append(stats)
+
+    if len(selected_forms) < target_count:
+        print(
+            f"ERROR: only found {len(selected_forms)} convertible conversations "
+            f"(requested {target_count})",
+            file=sys.stderr,
         )
-    except error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace")
-        print(f"HTTP ERROR {exc.code} during import: {body}", file=sys.stderr)
-        return 1
-    except Exception as exc:
-        print(f"ERROR during import: {exc}", file=sys.stderr)
         return 1
 
-    print(
-        f"Import finished: imported={imported_count} failed={failed_count} "
-        f"selected={len(selected_forms)}"
-    )
+    write_output(args, selected_forms)
+    print_selection_summary(selected_stats, args.summary_limit)
+    print_skipped(skipped)
 
-    if failed_count > 0 and args.continue_on_error:
+    if args.dry_run:
+        print("Dry run only. No import API call made.")
         return 0
-    return 1 if failed_count > 0 else 0
+
+    result = run_import(args, token, zip(selected_forms, selected_stats))
+    if result is None:
+        return 1
+
+    imported_count, failed_count = result
+    return finish_import(args, imported_count, failed_count, len(selected_forms))
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    try:
+        sys.exit(main())
+    finally:
+        close_http_client()